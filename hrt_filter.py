@@ -0,0 +1,222 @@
+"""Loading, matching and rendering helpers shared by the app's pages."""
+import streamlit as st
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import functools
+import hashlib
+import importlib.util
+import io
+import re
+import zipfile
+from pathlib import Path
+from typing import Optional
+from xml.etree import ElementTree
+
+# Prefer the Rust-based calamine reader; fall back to pandas' default engine
+# (openpyxl for .xlsx, xlrd for .xls) when python-calamine is not installed
+EXCEL_READ_ENGINE = 'calamine' if importlib.util.find_spec("python_calamine") else None
+
+@functools.lru_cache(maxsize=None)
+def _excel_parse_errors() -> tuple:
+    """Exceptions that mean an upload can't be read; anything else is left to the page's error boundary."""
+    # Only called from load_excel_file's except clause, i.e. after a read failed, so
+    # the engine modules aren't imported up front. ValueError covers files that
+    # aren't workbooks and missing sheets
+    errors = (ValueError, zipfile.BadZipFile)
+    if EXCEL_READ_ENGINE == 'calamine':
+        from python_calamine import CalamineError
+        return errors + (CalamineError,)
+    # openpyxl reports a truncated sheet as an XML parse error; xlrd raises its own
+    # errors for corrupt or encrypted .xls files
+    errors += (ElementTree.ParseError,)
+    if importlib.util.find_spec("xlrd"):
+        from xlrd import XLRDError
+        from xlrd.compdoc import CompDocError
+        errors += (XLRDError, CompDocError)
+    return errors
+
+# Column names that hold student identifiers (e.g. "bronco id", "student_id", "cpp_id",
+# "emplid"). Letter lookarounds rather than \b, since \b treats "_" as part of a word
+ID_COLUMN_RE = re.compile(r"bronco[_ ]?id|student[_ ]?id|emplid|(?<![a-z])id(?![a-z])")
+
+# Rows shown in the upload previews; the HRT file is only read this far until processing
+PREVIEW_ROWS = 5
+
+# Results with more rows than this are collapsed to their first rows instead of rendered in full
+MAX_RENDERED_ROWS = 5000
+LARGE_RESULT_PREVIEW_ROWS = 1000
+
+@functools.lru_cache(maxsize=None)
+def load_css() -> str:
+    """Read the shared stylesheet once per process."""
+    return (Path(__file__).parent / "assets" / "styles.css").read_text(encoding="utf-8")
+
+def _clean_column_name(col):
+    """Trim and lowercase a header; non-text headers (e.g. a year) are kept as-is."""
+    return col.strip().lower() if isinstance(col, str) else col
+
+# Bounded so a long-running server doesn't keep every uploaded workbook in memory
+@st.cache_data(show_spinner=False, max_entries=8)
+def _parse_excel(file_key: bytes, _source, sheet_name: str, nrows: Optional[int] = None,
+                 usecols: Optional[list] = None) -> pd.DataFrame:
+    """Parse an uploaded workbook; cached on its content hash so reruns skip re-parsing."""
+    # Open the workbook once and parse both passes from it, so the archive
+    # isn't unzipped and loaded a second time for the header read
+    _source.seek(0)
+    with pd.ExcelFile(_source, engine=EXCEL_READ_ENGINE) as workbook:
+        # Read ID-like columns as strings: pandas skips type inference on them and
+        # numeric IDs are not widened to floats when the column has blank cells
+        header = workbook.parse(sheet_name, nrows=0)
+        converters = {col: str for col in header.columns if ID_COLUMN_RE.search(str(_clean_column_name(col)))}
+        df = workbook.parse(
+            sheet_name,
+            # Default NumPy dtypes: columns mixing numbers and text (phone numbers,
+            # notes) load as object, where the Arrow backend fails to convert them
+            converters=converters or None,
+            nrows=nrows,
+            # usecols holds cleaned names, so match against each raw header after cleaning
+            usecols=(lambda col: _clean_column_name(col) in usecols) if usecols else None,
+        )
+    # Clean and standardize column names in one pass; Index.str would turn
+    # non-text headers into NaN and build an intermediate Index per call
+    df.columns = [_clean_column_name(col) for col in df.columns]
+    return df
+
+def file_fingerprint(uploaded_file) -> bytes:
+    """Content hash of an upload, used as its cache key."""
+    # Streamlit gives every upload a new file_id, so each one is hashed once and
+    # later reruns (e.g. when only the other file changes) reuse the digest
+    upload_key = (uploaded_file.file_id, uploaded_file.size)
+    fingerprints = st.session_state.setdefault("file_fingerprints", {})
+    if upload_key not in fingerprints:
+        # Hash through a zero-copy view instead of copying the upload with getvalue()
+        with uploaded_file.getbuffer() as buf:
+            fingerprints[upload_key] = hashlib.blake2b(buf, digest_size=16).digest()
+    return fingerprints[upload_key]
+
+def load_excel_file(uploaded_file, sheet_name: str = "Sheet1", nrows: Optional[int] = None,
+                    usecols: Optional[list] = None) -> Optional[pd.DataFrame]:
+    """Load Excel file and return DataFrame with cleaned column names.
+
+    ``nrows`` limits the read to the first rows and ``usecols`` to the given
+    (cleaned) column names, for callers that only need part of the sheet.
+    """
+    if uploaded_file is None:
+        return None
+    try:
+        # The file object itself is passed unhashed (leading underscore) to the cached parser
+        return _parse_excel(file_fingerprint(uploaded_file), uploaded_file, sheet_name, nrows, usecols)
+    except ImportError:
+        st.error("""
+        ❌ **Missing Dependency Error**
+
+        Please install an Excel reader: `pip install python-calamine openpyxl xlrd`
+        """)
+        return None
+    except _excel_parse_errors() as e:
+        st.error(f"❌ Error loading file: {str(e)}")
+        st.info("💡 **Troubleshooting tips:**")
+        st.write("- Make sure the file is a valid Excel file (.xlsx or .xls)")
+        st.write("- Check that the sheet name is correct")
+        st.write("- Ensure the file is not corrupted or password-protected")
+        return None
+
+def load_upload(uploaded_file, slot: str, sheet_name: str, nrows: Optional[int] = None,
+                usecols: Optional[list] = None) -> Optional[pd.DataFrame]:
+    """load_excel_file, keeping the result in ``st.session_state[slot]`` across reruns."""
+    # A session_state hit hands back the same frame, where a cache_data hit
+    # deserializes a fresh copy on every rerun
+    key = (file_fingerprint(uploaded_file), sheet_name, nrows, tuple(usecols or ()))
+    cached = st.session_state.get(slot)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    df = load_excel_file(uploaded_file, sheet_name, nrows, usecols)
+    if df is not None:
+        st.session_state[slot] = (key, df)
+    return df
+
+def validate_dataframe(df: pd.DataFrame, file_name: str, required_column: str) -> bool:
+    """Validate that the DataFrame contains the required column."""
+    if df is None:
+        return False
+
+    # Index membership is a hash lookup; the column list is only built for the error message
+    if required_column not in df.columns:
+        st.error(f"❌ '{required_column}' column not found in {file_name}")
+        st.write("Available columns:", list(df.columns))
+        return False
+
+    return True
+
+def _normalize_keys(s: pd.Series) -> pd.Series:
+    """Convert comparison keys to trimmed, case-insensitive text."""
+    # Whole-number floats (numeric IDs in a column with blanks) render as "1001", not "1001.0"
+    if pd.api.types.is_float_dtype(s):
+        values = s.dropna()
+        if (values.round() == values).all():
+            s = s.astype("Int64")
+    return s.astype("string[pyarrow]").str.strip().str.casefold()
+
+def filter_attendees(hrt_df: pd.DataFrame, hrt_column: str,
+                     bbq_df: pd.DataFrame, bbq_column: str) -> tuple:
+    """Split BBQ attendees into (non-HRT attendees, HRT majors who attended)."""
+    # Keys are compared as text so 1001 and " 1001" still match. Rosters often list
+    # a student more than once, so only distinct HRT values are normalized and hashed
+    hrt_keys = hrt_df[hrt_column].dropna().drop_duplicates()
+    if hrt_keys.empty:
+        # No HRT IDs to match, so every attendee is kept without scanning the BBQ keys
+        return bbq_df, bbq_df.iloc[:0]
+    hrt_ids = _normalize_keys(hrt_keys).unique()
+    bbq_keys = _normalize_keys(bbq_df[bbq_column])
+    # Arrow's is_in kernel probes the Arrow-backed keys in C++; Series.isin on
+    # Arrow strings is roughly 20x slower on large files
+    hrt_mask = pc.is_in(pa.array(bbq_keys), value_set=pa.array(hrt_ids)).to_numpy(zero_copy_only=False)
+    hrt_at_bbq = bbq_df.loc[hrt_mask] if hrt_mask.any() else bbq_df.iloc[:0]
+    return bbq_df.loc[~hrt_mask], hrt_at_bbq
+
+# Keyed on the uploads' content hashes plus sheet/column choices; the frames
+# themselves are passed unhashed since the fingerprints already identify them
+@st.cache_data(show_spinner=False, max_entries=4)
+def compute_non_hrt(hrt_key: bytes, hrt_sheet: str, hrt_column: str,
+                    bbq_key: bytes, bbq_sheet: str, bbq_column: str,
+                    _hrt_df: pd.DataFrame, _bbq_df: pd.DataFrame) -> tuple:
+    """Cached filter_attendees, so reruns with the same inputs skip the match."""
+    return filter_attendees(_hrt_df, hrt_column, _bbq_df, bbq_column)
+
+@st.cache_data(show_spinner=False)
+def create_download_link(df: pd.DataFrame, filename: str) -> bytes:
+    """Create downloadable Excel file."""
+    output = io.BytesIO()
+    # xlsxwriter writes cells straight to XML instead of building openpyxl's cell tree; URL
+    # detection is off since IDs and emails should stay plain text
+    with pd.ExcelWriter(output, engine='xlsxwriter', engine_kwargs={'options': {'strings_to_urls': False}}) as writer:
+        df.to_excel(writer, index=False, sheet_name='Non_HRT_Attendees')
+    return output.getvalue()
+
+def create_csv_bytes(df: pd.DataFrame) -> bytes:
+    """Create downloadable CSV file."""
+    # utf-8-sig adds a BOM so Excel opens accented names correctly
+    return df.to_csv(index=False).encode("utf-8-sig")
+
+def info_box(body: str, css_class: str = "info-box") -> None:
+    """Render an HTML snippet inside one of the styled callout boxes."""
+    st.html(f'<div class="{css_class}">{body}</div>')
+
+@st.fragment
+def show_preview(df: pd.DataFrame, title: str) -> None:
+    """Render the first rows and column names of an uploaded file."""
+    with st.expander(title):
+        st.dataframe(df.head(PREVIEW_ROWS), use_container_width=True)
+        st.write(f"**Columns:** {list(df.columns)}")
+
+def show_results_table(df: pd.DataFrame) -> None:
+    """Render the filtered attendees, collapsing large results to their first rows."""
+    # Sending tens of thousands of rows to st.dataframe makes every rerun slow;
+    # the CSV/xlsx downloads always contain the full list
+    if len(df) > MAX_RENDERED_ROWS:
+        st.caption(f"{len(df)} rows — download the file below for the full list.")
+        with st.expander(f"Show first {LARGE_RESULT_PREVIEW_ROWS} rows"):
+            st.dataframe(df.head(LARGE_RESULT_PREVIEW_ROWS), use_container_width=True)
+    else:
+        st.dataframe(df, use_container_width=True)
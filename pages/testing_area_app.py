@@ -1,27 +1,25 @@
-
 import streamlit as st
 import pandas as pd
-import io
+import functools
 from typing import Optional
 
-# Check for required dependencies
-try:
-    import openpyxl
-except ImportError:
-    st.error("""
-    ❌ **Missing Dependency Error**
-    
-    The `openpyxl` library is required to read Excel files but is not installed.
-    
-    **To fix this issue:**
-    1. Stop the Streamlit app (Ctrl+C)
-    2. Run: `pip install openpyxl`
-    3. Restart the app: `streamlit run hrt_filter_app.py`
-    
-    **Alternative:** Install all dependencies at once:
-    `pip install streamlit pandas openpyxl xlrd`
-    """)
-    st.stop()
+from hrt_filter import (
+    ID_COLUMN_RE,
+    PREVIEW_ROWS,
+    compute_non_hrt,
+    create_csv_bytes,
+    create_download_link,
+    file_fingerprint,
+    info_box,
+    load_css,
+    load_upload,
+    show_preview,
+    show_results_table,
+    validate_dataframe,
+)
+
+# Attendee names listed inline in the results before the rest move into an expander
+MAX_LISTED_ATTENDEES = 50
 
 # Page configuration
 st.set_page_config(
@@ -32,98 +30,23 @@ st.set_page_config(
 )
 
 # Custom CSS for better styling
-st.markdown("""
-<style>
-    .main-header {
-        font-size: 2.5rem;
-        color: #1f77b4;
-        text-align: center;
-        margin-bottom: 2rem;
-    }
-    .section-header {
-        font-size: 1.5rem;
-        color: #2c3e50;
-        margin: 1.5rem 0 1rem 0;
-        border-bottom: 2px solid #3498db;
-        padding-bottom: 0.5rem;
-    }
-    .info-box {
-        background-color: #e8f4fd;
-        padding: 1rem;
-        border-radius: 0.5rem;
-        border-left: 4px solid #3498db;
-        margin: 1rem 0;
-    }
-    .success-box {
-        background-color: #d4edda;
-        padding: 1rem;
-        border-radius: 0.5rem;
-        border-left: 4px solid #28a745;
-        margin: 1rem 0;
-    }
-    .warning-box {
-        background-color: #fff3cd;
-        padding: 1rem;
-        border-radius: 0.5rem;
-        border-left: 4px solid #ffc107;
-        margin: 1rem 0;
-    }
-</style>
-""", unsafe_allow_html=True)
-
-def load_excel_file(uploaded_file, sheet_name: str = "Sheet1") -> Optional[pd.DataFrame]:
-    """Load Excel file and return DataFrame with cleaned column names."""
-    try:
-        df = pd.read_excel(uploaded_file, sheet_name=sheet_name, engine='openpyxl')
-        # Clean and standardize column names
-        df.columns = df.columns.str.strip().str.lower()
-        return df
-    except ImportError as e:
-        st.error("""
-        ❌ **Missing Dependency Error**
-        
-        Please install openpyxl: `pip install openpyxl`
-        """)
-        return None
-    except FileNotFoundError:
-        st.error(f"❌ Sheet '{sheet_name}' not found in the Excel file. Please check the sheet name.")
-        return None
-    except Exception as e:
-        st.error(f"❌ Error loading file: {str(e)}")
-        st.info("💡 **Troubleshooting tips:**")
-        st.write("- Make sure the file is a valid Excel file (.xlsx or .xls)")
-        st.write("- Check that the sheet name is correct")
-        st.write("- Ensure the file is not corrupted or password-protected")
-        return None
-
-def validate_dataframe(df: pd.DataFrame, file_name: str, required_column: str) -> bool:
-    """Validate that the DataFrame contains the required column."""
-    if df is None:
-        return False
-    
-    if required_column not in df.columns:
-        st.error(f"❌ '{required_column}' column not found in {file_name}")
-        st.write("Available columns:", list(df.columns))
-        return False
-    
-    return True
-
-def create_download_link(df: pd.DataFrame, filename: str) -> bytes:
-    """Create downloadable Excel file."""
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name='Non_HRT_Attendees')
-    return output.getvalue()
-
+st.html(f"<style>{load_css()}</style>")
 
+@st.cache_data(show_spinner=False)
+def _column_meta(file_key: bytes, sheet_name: str, nrows: Optional[int], _df: pd.DataFrame) -> dict:
+    """Map each column to (sample values, type name of its first value), once per upload."""
+    meta = {}
+    for col in _df.columns:
+        samples = _df[col].dropna().head(3).tolist()
+        meta[col] = (samples, type(samples[0]).__name__ if samples else None)
+    return meta
 
 # Main App
 def main():
     # Header
     st.markdown('<h1 class="main-header">🎓 HRT Major Filter App</h1>', unsafe_allow_html=True)
     
-    st.markdown("""
-    <div class="info-box">
+    info_box("""
         <h4>📋 What does this app do?</h4>
         <p>This app helps you identify BBQ attendees who are <strong>NOT</strong> HRT (Hospitality, Recreation & Tourism) majors by comparing two Excel files:</p>
         <ul>
@@ -131,8 +54,7 @@ def main():
             <li><strong>BBQ Attendees file:</strong> Contains list of all BBQ attendees</li>
         </ul>
         <p>The app will filter out HRT majors from the BBQ attendees list and provide you with a downloadable Excel file of non-HRT attendees.</p>
-    </div>
-    """, unsafe_allow_html=True)
+    """)
 
     # Sidebar for configuration
     with st.sidebar:
@@ -143,8 +65,7 @@ def main():
         hrt_sheet = st.text_input("HRT Majors Sheet Name", value="Sheet1")
         bbq_sheet = st.text_input("BBQ Attendees Sheet Name", value="Sheet1")
         
-        st.markdown("""
-        <div class="info-box">
+        info_box("""
             <h5>💡 Tips:</h5>
             <ul>
                 <li>Upload your files first to see available columns</li>
@@ -152,8 +73,7 @@ def main():
                 <li>Default sheet name is "Sheet1"</li>
                 <li>Select the columns you want to compare after uploading</li>
             </ul>
-        </div>
-        """, unsafe_allow_html=True)
+        """)
 
     # Main content area
     col1, col2 = st.columns(2)
@@ -173,16 +93,16 @@ def main():
         )
         
         if hrt_file is not None:
+            # Only the header and a few preview rows are needed to pick a column;
+            # the comparison column alone is read in full when processing
             with st.spinner("Loading HRT Majors file..."):
-                hrt_df = load_excel_file(hrt_file, hrt_sheet)
+                hrt_df = load_upload(hrt_file, "hrt_preview", hrt_sheet, nrows=PREVIEW_ROWS)
             
             if hrt_df is not None:
-                st.success(f"✅ Loaded {len(hrt_df)} HRT majors")
+                st.success(f"✅ Loaded HRT Majors file ({len(hrt_df.columns)} columns)")
                 
                 # Show preview
-                with st.expander("Preview HRT Majors Data"):
-                    st.dataframe(hrt_df.head(), use_container_width=True)
-                    st.write(f"**Columns:** {list(hrt_df.columns)}")
+                show_preview(hrt_df, "Preview HRT Majors Data")
 
     with col2:
         st.markdown('<h2 class="section-header">📁 Upload BBQ Attendees File</h2>', unsafe_allow_html=True)
@@ -195,15 +115,13 @@ def main():
         
         if bbq_file is not None:
             with st.spinner("Loading BBQ Attendees file..."):
-                bbq_df = load_excel_file(bbq_file, bbq_sheet)
+                bbq_df = load_upload(bbq_file, "bbq_df", bbq_sheet)
             
             if bbq_df is not None:
                 st.success(f"✅ Loaded {len(bbq_df)} BBQ attendees")
                 
                 # Show preview
-                with st.expander("Preview BBQ Attendees Data"):
-                    st.dataframe(bbq_df.head(), use_container_width=True)
-                    st.write(f"**Columns:** {list(bbq_df.columns)}")
+                show_preview(bbq_df, "Preview BBQ Attendees Data")
 
     # Column Selection Section (only show when data is loaded)
     if hrt_df is not None and bbq_df is not None:
@@ -213,14 +131,11 @@ def main():
         
         with col_sel1:
             st.subheader("🎓 HRT Majors File")
-            hrt_column_options = list(hrt_df.columns)
+            hrt_meta = _column_meta(file_fingerprint(hrt_file), hrt_sheet, PREVIEW_ROWS, hrt_df)
+            hrt_column_options = list(hrt_meta)
             
             # Try to find a default column (bronco id, id, student id, etc.)
-            default_hrt_idx = 0
-            for i, col in enumerate(hrt_column_options):
-                if any(keyword in col.lower() for keyword in ['bronco id', 'id', 'student id', 'student_id']):
-                    default_hrt_idx = i
-                    break
+            default_hrt_idx = next((i for i, col in enumerate(hrt_column_options) if ID_COLUMN_RE.search(str(col))), 0)
             
             hrt_comparison_column = st.selectbox(
                 "Select comparison column from HRT Majors:",
@@ -232,21 +147,22 @@ def main():
             
             # Show sample values
             if hrt_comparison_column:
-                sample_values = hrt_df[hrt_comparison_column].dropna().head(3).tolist()
-                st.write(f"**Sample values:** {sample_values}")
+                st.write(f"**Sample values:** {hrt_meta[hrt_comparison_column][0]}")
         
         with col_sel2:
             st.subheader("🍖 BBQ Attendees File")
-            bbq_column_options = list(bbq_df.columns)
+            bbq_meta = _column_meta(file_fingerprint(bbq_file), bbq_sheet, None, bbq_df)
+            bbq_column_options = list(bbq_meta)
             
             # Try to find a default column that matches or is similar to HRT column
             default_bbq_idx = 0
             if hrt_comparison_column:
-                for i, col in enumerate(bbq_column_options):
-                    if (col.lower() == hrt_comparison_column.lower() or 
-                        any(keyword in col.lower() for keyword in ['bronco id', 'id', 'student id', 'student_id'])):
-                        default_bbq_idx = i
-                        break
+                # Column names are already lowercased by load_excel_file
+                default_bbq_idx = next(
+                    (i for i, col in enumerate(bbq_column_options)
+                     if col == hrt_comparison_column or ID_COLUMN_RE.search(str(col))),
+                    0
+                )
             
             bbq_comparison_column = st.selectbox(
                 "Select comparison column from BBQ Attendees:",
@@ -258,31 +174,24 @@ def main():
             
             # Show sample values
             if bbq_comparison_column:
-                sample_values = bbq_df[bbq_comparison_column].dropna().head(3).tolist()
-                st.write(f"**Sample values:** {sample_values}")
+                st.write(f"**Sample values:** {bbq_meta[bbq_comparison_column][0]}")
         
         # Show comparison summary
         if hrt_comparison_column and bbq_comparison_column:
-            st.markdown("""
-            <div class="info-box">
+            info_box("""
                 <h4>🔍 Comparison Setup:</h4>
                 <ul>
                     <li><strong>HRT Majors column:</strong> {}</li>
                     <li><strong>BBQ Attendees column:</strong> {}</li>
                     <li><strong>Comparison method:</strong> Find BBQ attendees whose {} is NOT in the HRT Majors {} list</li>
                 </ul>
-            </div>
-            """.format(hrt_comparison_column, bbq_comparison_column, bbq_comparison_column, hrt_comparison_column), 
-            unsafe_allow_html=True)
+            """.format(hrt_comparison_column, bbq_comparison_column, bbq_comparison_column, hrt_comparison_column))
             
-            # Data type validation
-            hrt_sample = hrt_df[hrt_comparison_column].dropna().iloc[0] if not hrt_df[hrt_comparison_column].dropna().empty else None
-            bbq_sample = bbq_df[bbq_comparison_column].dropna().iloc[0] if not bbq_df[bbq_comparison_column].dropna().empty else None
+            # Data type validation (type of each column's first non-null value)
+            hrt_type = hrt_meta[hrt_comparison_column][1]
+            bbq_type = bbq_meta[bbq_comparison_column][1]
             
-            if hrt_sample is not None and bbq_sample is not None:
-                hrt_type = type(hrt_sample).__name__
-                bbq_type = type(bbq_sample).__name__
-                
+            if hrt_type is not None and bbq_type is not None:
                 if hrt_type != bbq_type:
                     st.warning(f"⚠️ **Data Type Mismatch:** HRT column contains {hrt_type} while BBQ column contains {bbq_type}. This might affect comparison accuracy.")
                 else:
@@ -290,8 +199,7 @@ def main():
     
     else:
         # Show placeholder when no data is loaded
-        st.markdown("""
-        <div class="info-box">
+        info_box("""
             <h4>📋 Column Selection</h4>
             <p>Upload both Excel files to see available columns for comparison. The app will:</p>
             <ul>
@@ -300,8 +208,7 @@ def main():
                 <li>Show sample values to verify your selection</li>
                 <li>Validate data types for accurate comparison</li>
             </ul>
-        </div>
-        """, unsafe_allow_html=True)
+        """)
 
     # Processing section
     if hrt_df is not None and bbq_df is not None:
@@ -313,87 +220,105 @@ def main():
         
         # Validate both files have the required columns
         if hrt_comparison_column and bbq_comparison_column:
-            hrt_valid = hrt_comparison_column in hrt_df.columns
-            bbq_valid = bbq_comparison_column in bbq_df.columns
-            
-            if not hrt_valid:
-                st.error(f"❌ Column '{hrt_comparison_column}' not found in HRT Majors file")
-            if not bbq_valid:
-                st.error(f"❌ Column '{bbq_comparison_column}' not found in BBQ Attendees file")
+            hrt_valid = validate_dataframe(hrt_df, "HRT Majors file", hrt_comparison_column)
+            bbq_valid = validate_dataframe(bbq_df, "BBQ Attendees file", bbq_comparison_column)
             
             if hrt_valid and bbq_valid:
                 if st.button("🚀 Filter Non-HRT Attendees", type="primary", use_container_width=True):
                     with st.spinner("Processing data..."):
-                        try:
-                            # Filter out non-HRT majors
-                            non_hrt_attendees = bbq_df[~bbq_df[bbq_comparison_column].isin(hrt_df[hrt_comparison_column])]
+                        hrt_keys_df = load_upload(hrt_file, "hrt_keys", hrt_sheet, usecols=[hrt_comparison_column])
+                        
+                        if hrt_keys_df is not None:
+                            try:
+                                non_hrt_attendees, hrt_at_bbq = compute_non_hrt(
+                                    file_fingerprint(hrt_file), hrt_sheet, hrt_comparison_column,
+                                    file_fingerprint(bbq_file), bbq_sheet, bbq_comparison_column,
+                                    hrt_keys_df, bbq_df,
+                                )
+                                hrt_count = len(hrt_at_bbq)
+                                non_hrt_count = len(non_hrt_attendees)
                             
-                            # Display results
-                            st.markdown('<div class="success-box">', unsafe_allow_html=True)
-                            st.write("### 📊 Results:")
-                            st.write(f"- **Total BBQ Attendees:** {len(bbq_df)}")
-                            st.write(f"- **Total HRT Majors:** {len(hrt_df)}")
-                            st.write(f"- **HRT Majors at BBQ:** {len(bbq_df) - len(non_hrt_attendees)}")
-                            st.write(f"- **Non-HRT Attendees:** {len(non_hrt_attendees)}")
-                            st.write(f"- **Comparison Method:** Comparing '{bbq_comparison_column}' with '{hrt_comparison_column}'")
+                                # Display results
+                                st.markdown('<div class="success-box">', unsafe_allow_html=True)
+                                st.write("### 📊 Results:")
+                                st.write(f"- **Total BBQ Attendees:** {len(bbq_df)}")
+                                st.write(f"- **Total HRT Majors:** {len(hrt_keys_df)}")
+                                st.write(f"- **HRT Majors at BBQ:** {hrt_count}")
+                                st.write(f"- **Non-HRT Attendees:** {non_hrt_count}")
+                                st.write(f"- **Comparison Method:** Comparing '{bbq_comparison_column}' with '{hrt_comparison_column}'")
                             
-                            # Show which HRT majors attended
-                            hrt_at_bbq = bbq_df[bbq_df[bbq_comparison_column].isin(hrt_df[hrt_comparison_column])]
-                            if len(hrt_at_bbq) > 0:
-                                # Try to get name column for display
-                                name_col = None
-                                for col in bbq_df.columns:
-                                    if 'name' in col.lower():
-                                        name_col = col
-                                        break
+                                # Show which HRT majors attended
+                                if hrt_count > 0:
+                                    # Try to get name column for display
+                                    name_col = None
+                                    for col in bbq_df.columns:
+                                        if 'name' in str(col):
+                                            name_col = col
+                                            break
                                 
-                                if name_col:
-                                    hrt_names = hrt_at_bbq[name_col].tolist()
-                                    st.write(f"- **HRT Majors who attended BBQ:** {', '.join(map(str, hrt_names))}")
-                                else:
-                                    st.write(f"- **HRT Major IDs at BBQ:** {', '.join(map(str, hrt_at_bbq[bbq_comparison_column].tolist()))}")
+                                    if name_col:
+                                        label, attended = "HRT Majors who attended BBQ", hrt_at_bbq[name_col]
+                                    else:
+                                        label, attended = "HRT Major IDs at BBQ", hrt_at_bbq[bbq_comparison_column]
+                                
+                                    # Cast to Arrow strings in one vectorized pass and only inline the first
+                                    # few; rendering thousands of names in one line is what slows the page
+                                    attended = attended.dropna().astype("string[pyarrow]")
+                                    listed = ', '.join(attended.iloc[:MAX_LISTED_ATTENDEES].tolist())
+                                    if len(attended) > MAX_LISTED_ATTENDEES:
+                                        st.write(f"- **{label}:** {listed}, … ({len(attended) - MAX_LISTED_ATTENDEES} more)")
+                                        with st.expander(f"Show all {len(attended)}"):
+                                            st.dataframe(attended, hide_index=True, use_container_width=True)
+                                    else:
+                                        st.write(f"- **{label}:** {listed}")
                             
-                            st.markdown('</div>', unsafe_allow_html=True)
+                                st.markdown('</div>', unsafe_allow_html=True)
                             
-                            # Show filtered data
-                            if len(non_hrt_attendees) > 0:
-                                st.subheader("👥 Non-HRT BBQ Attendees")
-                                st.dataframe(non_hrt_attendees, use_container_width=True)
+                                # Show filtered data
+                                if non_hrt_count > 0:
+                                    st.subheader("👥 Non-HRT BBQ Attendees")
+                                    show_results_table(non_hrt_attendees)
                                 
-                                # Download button
-                                excel_data = create_download_link(non_hrt_attendees, "Non_HRT_BBQ_Attendees.xlsx")
-                                st.download_button(
-                                    label="📥 Download Non-HRT Attendees Excel File",
-                                    data=excel_data,
-                                    file_name="Non_HRT_BBQ_Attendees.xlsx",
-                                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                                    type="primary",
-                                    use_container_width=True
-                                )
-                            else:
-                                st.info("🎉 All BBQ attendees are HRT majors!")
+                                    # Download buttons; each file is only written when its button is clicked.
+                                    # CSV is the default since it skips the xlsx zip/XML serializer
+                                    csv_col, xlsx_col = st.columns(2)
+                                    with csv_col:
+                                        st.download_button(
+                                            label="📥 Download Non-HRT Attendees (CSV)",
+                                            data=functools.partial(create_csv_bytes, non_hrt_attendees),
+                                            file_name="Non_HRT_BBQ_Attendees.csv",
+                                            mime="text/csv",
+                                            type="primary",
+                                            use_container_width=True
+                                        )
+                                    with xlsx_col:
+                                        st.download_button(
+                                            label="📥 Download as Excel (.xlsx)",
+                                            data=functools.partial(create_download_link, non_hrt_attendees, "Non_HRT_BBQ_Attendees.xlsx"),
+                                            file_name="Non_HRT_BBQ_Attendees.xlsx",
+                                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                                            use_container_width=True
+                                        )
+                                else:
+                                    st.info("🎉 All BBQ attendees are HRT majors!")
                                 
-                        except Exception as e:
-                            st.error(f"❌ Error processing data: {str(e)}")
-                            st.write("**Debug info:**")
-                            st.write(f"- HRT column: {hrt_comparison_column}")
-                            st.write(f"- BBQ column: {bbq_comparison_column}")
-                            st.write(f"- HRT shape: {hrt_df.shape}")
-                            st.write(f"- BBQ shape: {bbq_df.shape}")
+                            except Exception as e:
+                                st.error(f"❌ Error processing data: {str(e)}")
+                                st.write("**Debug info:**")
+                                st.write(f"- HRT column: {hrt_comparison_column}")
+                                st.write(f"- BBQ column: {bbq_comparison_column}")
+                                st.write(f"- HRT shape: {hrt_keys_df.shape}")
+                                st.write(f"- BBQ shape: {bbq_df.shape}")
             else:
-                st.markdown("""
-                <div class="warning-box">
+                info_box("""
                     <h4>⚠️ Cannot Process</h4>
                     <p>Please ensure both files contain the selected comparison columns before processing.</p>
-                </div>
-                """, unsafe_allow_html=True)
+                """, css_class="warning-box")
         else:
-            st.markdown("""
-            <div class="warning-box">
+            info_box("""
                 <h4>⚠️ Column Selection Required</h4>
                 <p>Please select comparison columns from both files in the "Column Selection" section above.</p>
-            </div>
-            """, unsafe_allow_html=True)
+            """, css_class="warning-box")
 
     # Instructions section
     with st.expander("📖 Detailed Instructions", expanded=False):
@@ -475,4 +400,10 @@ def main():
     """, unsafe_allow_html=True)
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    except Exception as e:
+        # Error boundary for anything the handlers above don't expect; st.stop() and
+        # st.rerun() raise BaseException subclasses, so they pass straight through
+        st.error(f"❌ Unexpected error: {str(e)}")
+        st.exception(e)
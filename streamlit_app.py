@@ -1,26 +1,19 @@
 import streamlit as st
-import pandas as pd
-import io
-from typing import Optional
+import functools
 
-# Check for required dependencies
-try:
-    import openpyxl
-except ImportError:
-    st.error("""
-    ❌ **Missing Dependency Error**
-    
-    The `openpyxl` library is required to read Excel files but is not installed.
-    
-    **To fix this issue:**
-    1. Stop the Streamlit app (Ctrl+C)
-    2. Run: `pip install openpyxl`
-    3. Restart the app: `streamlit run hrt_filter_app.py`
-    
-    **Alternative:** Install all dependencies at once:
-    `pip install streamlit pandas openpyxl xlrd`
-    """)
-    st.stop()
+from hrt_filter import (
+    PREVIEW_ROWS,
+    compute_non_hrt,
+    create_csv_bytes,
+    create_download_link,
+    file_fingerprint,
+    info_box,
+    load_css,
+    load_upload,
+    show_preview,
+    show_results_table,
+    validate_dataframe,
+)
 
 # Page configuration
 st.set_page_config(
@@ -31,96 +24,14 @@ st.set_page_config(
 )
 
 # Custom CSS for better styling
-st.markdown("""
-<style>
-    .main-header {
-        font-size: 2.5rem;
-        color: #1f77b4;
-        text-align: center;
-        margin-bottom: 2rem;
-    }
-    .section-header {
-        font-size: 1.5rem;
-        color: #2c3e50;
-        margin: 1.5rem 0 1rem 0;
-        border-bottom: 2px solid #3498db;
-        padding-bottom: 0.5rem;
-    }
-    .info-box {
-        background-color: #e8f4fd;
-        padding: 1rem;
-        border-radius: 0.5rem;
-        border-left: 4px solid #3498db;
-        margin: 1rem 0;
-    }
-    .success-box {
-        background-color: #d4edda;
-        padding: 1rem;
-        border-radius: 0.5rem;
-        border-left: 4px solid #28a745;
-        margin: 1rem 0;
-    }
-    .warning-box {
-        background-color: #fff3cd;
-        padding: 1rem;
-        border-radius: 0.5rem;
-        border-left: 4px solid #ffc107;
-        margin: 1rem 0;
-    }
-</style>
-""", unsafe_allow_html=True)
-
-def load_excel_file(uploaded_file, sheet_name: str = "Sheet1") -> Optional[pd.DataFrame]:
-    """Load Excel file and return DataFrame with cleaned column names."""
-    try:
-        df = pd.read_excel(uploaded_file, sheet_name=sheet_name, engine='openpyxl')
-        # Clean and standardize column names
-        df.columns = df.columns.str.strip().str.lower()
-        return df
-    except ImportError as e:
-        st.error("""
-        ❌ **Missing Dependency Error**
-        
-        Please install openpyxl: `pip install openpyxl`
-        """)
-        return None
-    except FileNotFoundError:
-        st.error(f"❌ Sheet '{sheet_name}' not found in the Excel file. Please check the sheet name.")
-        return None
-    except Exception as e:
-        st.error(f"❌ Error loading file: {str(e)}")
-        st.info("💡 **Troubleshooting tips:**")
-        st.write("- Make sure the file is a valid Excel file (.xlsx or .xls)")
-        st.write("- Check that the sheet name is correct")
-        st.write("- Ensure the file is not corrupted or password-protected")
-        return None
-
-def validate_dataframe(df: pd.DataFrame, file_name: str, required_column: str) -> bool:
-    """Validate that the DataFrame contains the required column."""
-    if df is None:
-        return False
-    
-    if required_column not in df.columns:
-        st.error(f"❌ '{required_column}' column not found in {file_name}")
-        st.write("Available columns:", list(df.columns))
-        return False
-    
-    return True
-
-def create_download_link(df: pd.DataFrame, filename: str) -> bytes:
-    """Create downloadable Excel file."""
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name='Non_HRT_Attendees')
-    return output.getvalue()
+st.html(f"<style>{load_css()}</style>")
 
 # Main App
 def main():
     # Header
     st.markdown('<h1 class="main-header">🎓 HRT Major Filter App</h1>', unsafe_allow_html=True)
     
-    st.markdown("""
-    <div class="info-box">
+    info_box("""
         <h4>📋 What does this app do?</h4>
         <p>This app helps you identify BBQ attendees who are <strong>NOT</strong> HRT (Hospitality, Recreation & Tourism) majors by comparing two Excel files:</p>
         <ul>
@@ -128,8 +39,7 @@ def main():
             <li><strong>BBQ Attendees file:</strong> Contains list of all BBQ attendees</li>
         </ul>
         <p>The app will filter out HRT majors from the BBQ attendees list and provide you with a downloadable Excel file of non-HRT attendees.</p>
-    </div>
-    """, unsafe_allow_html=True)
+    """)
 
     # Sidebar for configuration
     with st.sidebar:
@@ -148,16 +58,14 @@ def main():
         hrt_sheet = st.text_input("HRT Majors Sheet Name", value="Sheet1")
         bbq_sheet = st.text_input("BBQ Attendees Sheet Name", value="Sheet1")
         
-        st.markdown("""
-        <div class="info-box">
+        info_box("""
             <h5>💡 Tips:</h5>
             <ul>
                 <li>Column names are automatically cleaned (spaces trimmed, converted to lowercase)</li>
                 <li>Make sure both files have the same column name for comparison</li>
                 <li>Default sheet name is "Sheet1"</li>
             </ul>
-        </div>
-        """, unsafe_allow_html=True)
+        """)
 
     # Main content area
     col1, col2 = st.columns(2)
@@ -172,16 +80,16 @@ def main():
         )
         
         if hrt_file is not None:
+            # Only the header and preview rows are needed until the filter runs;
+            # the comparison column alone is read in full when processing
             with st.spinner("Loading HRT Majors file..."):
-                hrt_df = load_excel_file(hrt_file, hrt_sheet)
+                hrt_df = load_upload(hrt_file, "hrt_preview", hrt_sheet, nrows=PREVIEW_ROWS)
             
             if hrt_df is not None:
-                st.success(f"✅ Loaded {len(hrt_df)} HRT majors")
+                st.success(f"✅ Loaded HRT Majors file ({len(hrt_df.columns)} columns)")
                 
                 # Show preview
-                with st.expander("Preview HRT Majors Data"):
-                    st.dataframe(hrt_df.head(), use_container_width=True)
-                    st.write(f"**Columns:** {list(hrt_df.columns)}")
+                show_preview(hrt_df, "Preview HRT Majors Data")
 
     with col2:
         st.markdown('<h2 class="section-header">📁 Upload BBQ Attendees File</h2>', unsafe_allow_html=True)
@@ -194,15 +102,13 @@ def main():
         
         if bbq_file is not None:
             with st.spinner("Loading BBQ Attendees file..."):
-                bbq_df = load_excel_file(bbq_file, bbq_sheet)
+                bbq_df = load_upload(bbq_file, "bbq_df", bbq_sheet)
             
             if bbq_df is not None:
                 st.success(f"✅ Loaded {len(bbq_df)} BBQ attendees")
                 
                 # Show preview
-                with st.expander("Preview BBQ Attendees Data"):
-                    st.dataframe(bbq_df.head(), use_container_width=True)
-                    st.write(f"**Columns:** {list(bbq_df.columns)}")
+                show_preview(bbq_df, "Preview BBQ Attendees Data")
 
     # Processing section
     if 'hrt_df' in locals() and 'bbq_df' in locals() and hrt_df is not None and bbq_df is not None:
@@ -215,46 +121,62 @@ def main():
         if hrt_valid and bbq_valid:
             if st.button("🚀 Filter Non-HRT Attendees", type="primary", use_container_width=True):
                 with st.spinner("Processing data..."):
-                    try:
-                        # Filter out non-HRT majors
-                        non_hrt_attendees = bbq_df[~bbq_df[comparison_column].isin(hrt_df[comparison_column])]
+                    hrt_keys_df = load_upload(hrt_file, "hrt_keys", hrt_sheet, usecols=[comparison_column])
+                    
+                    if hrt_keys_df is not None:
+                        try:
+                            # Filter out non-HRT majors
+                            non_hrt_attendees, hrt_at_bbq = compute_non_hrt(
+                                file_fingerprint(hrt_file), hrt_sheet, comparison_column,
+                                file_fingerprint(bbq_file), bbq_sheet, comparison_column,
+                                hrt_keys_df, bbq_df,
+                            )
+                            hrt_count, non_hrt_count = len(hrt_at_bbq), len(non_hrt_attendees)
                         
-                        # Display results
-                        st.markdown('<div class="success-box">', unsafe_allow_html=True)
-                        st.write("### 📊 Results:")
-                        st.write(f"- **Total BBQ Attendees:** {len(bbq_df)}")
-                        st.write(f"- **HRT Majors:** {len(hrt_df)}")
-                        st.write(f"- **HRT Majors at BBQ:** {len(bbq_df) - len(non_hrt_attendees)}")
-                        st.write(f"- **Non-HRT Attendees:** {len(non_hrt_attendees)}")
-                        st.markdown('</div>', unsafe_allow_html=True)
+                            # Display results
+                            st.markdown('<div class="success-box">', unsafe_allow_html=True)
+                            st.write("### 📊 Results:")
+                            st.write(f"- **Total BBQ Attendees:** {len(bbq_df)}")
+                            st.write(f"- **HRT Majors:** {len(hrt_keys_df)}")
+                            st.write(f"- **HRT Majors at BBQ:** {hrt_count}")
+                            st.write(f"- **Non-HRT Attendees:** {non_hrt_count}")
+                            st.markdown('</div>', unsafe_allow_html=True)
                         
-                        # Show filtered data
-                        if len(non_hrt_attendees) > 0:
-                            st.subheader("👥 Non-HRT BBQ Attendees")
-                            st.dataframe(non_hrt_attendees, use_container_width=True)
+                            # Show filtered data
+                            if non_hrt_count > 0:
+                                st.subheader("👥 Non-HRT BBQ Attendees")
+                                show_results_table(non_hrt_attendees)
                             
-                            # Download button
-                            excel_data = create_download_link(non_hrt_attendees, "Non_HRT_BBQ_Attendees.xlsx")
-                            st.download_button(
-                                label="📥 Download Non-HRT Attendees Excel File",
-                                data=excel_data,
-                                file_name="Non_HRT_BBQ_Attendees.xlsx",
-                                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                                type="primary",
-                                use_container_width=True
-                            )
-                        else:
-                            st.info("🎉 All BBQ attendees are HRT majors!")
+                                # Download buttons; each file is only written when its button is clicked.
+                                # CSV is the default since it skips the xlsx zip/XML serializer
+                                csv_col, xlsx_col = st.columns(2)
+                                with csv_col:
+                                    st.download_button(
+                                        label="📥 Download Non-HRT Attendees (CSV)",
+                                        data=functools.partial(create_csv_bytes, non_hrt_attendees),
+                                        file_name="Non_HRT_BBQ_Attendees.csv",
+                                        mime="text/csv",
+                                        type="primary",
+                                        use_container_width=True
+                                    )
+                                with xlsx_col:
+                                    st.download_button(
+                                        label="📥 Download as Excel (.xlsx)",
+                                        data=functools.partial(create_download_link, non_hrt_attendees, "Non_HRT_BBQ_Attendees.xlsx"),
+                                        file_name="Non_HRT_BBQ_Attendees.xlsx",
+                                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                                        use_container_width=True
+                                    )
+                            else:
+                                st.info("🎉 All BBQ attendees are HRT majors!")
                             
-                    except Exception as e:
-                        st.error(f"❌ Error processing data: {str(e)}")
+                        except Exception as e:
+                            st.error(f"❌ Error processing data: {str(e)}")
         else:
-            st.markdown("""
-            <div class="warning-box">
+            info_box("""
                 <h4>⚠️ Cannot Process</h4>
                 <p>Please ensure both files contain the specified comparison column before processing.</p>
-            </div>
-            """, unsafe_allow_html=True)
+            """, css_class="warning-box")
 
     # Instructions section
     with st.expander("📖 Detailed Instructions", expanded=False):
@@ -291,4 +213,10 @@ def main():
         """)
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    except Exception as e:
+        # Error boundary for anything the handlers above don't expect; st.stop() and
+        # st.rerun() raise BaseException subclasses, so they pass straight through
+        st.error(f"❌ Unexpected error: {str(e)}")
+        st.exception(e)